@@ -1,8 +1,8 @@
-import simpy
-import random
+import multiprocessing
 import time
 import numpy as np
 import matplotlib.pyplot as plt
+from numba import njit
 
 # --- Simulation Parameters ---
 RANDOM_SEED = 42
@@ -15,6 +15,15 @@ NUM_CAPPING_MACHINES = 2
 NUM_LABELING_MACHINES = 2
 NUM_PACKAGING_STATIONS = 1
 
+VERBOSE = False # Print the per-event log of every order; formatting it dominates run time for large runs
+# Once this many orders have completed, the source stops and the rest of the target is
+# extrapolated from the orders simulated so far (0 simulates every order in detail).
+# Only used when every stage can keep up with its orders, so that a steady state exists.
+FAST_FORWARD_AFTER = 2000
+FAST_FORWARD_WARMUP = 500 # Orders left out of the extrapolation while the factory fills up from empty
+SIMULATION_MODE = "simulate" # "simulate" runs the event simulation; "analytic" reports closed-form queueing estimates instead
+NUM_SHARDS = 1 # Independent factories to split the orders across; above 1, shards run in parallel processes
+
 DRINK_ORDER_INTERARRIVAL_TIME_MEAN = 15 # Mean time between new drink orders (minutes)
 
 # Processing times (mean, std dev) in minutes per batch/order
@@ -29,250 +38,492 @@ PROCESSING_TIME_LABELING_STD = 0.5
 PROCESSING_TIME_PACKAGING_MEAN = 12
 PROCESSING_TIME_PACKAGING_STD = 2
 
+# Production stages in processing order: (machine name, activity, units, processing time mean, std dev)
+STAGES = [
+    ("Mixing Station", "Mixing", NUM_MIXING_STATIONS, PROCESSING_TIME_MIXING_MEAN, PROCESSING_TIME_MIXING_STD),
+    ("Filling Line", "Filling", NUM_FILLING_LINES, PROCESSING_TIME_FILLING_MEAN, PROCESSING_TIME_FILLING_STD),
+    ("Capping Machine", "Capping", NUM_CAPPING_MACHINES, PROCESSING_TIME_CAPPING_MEAN, PROCESSING_TIME_CAPPING_STD),
+    ("Labeling Machine", "Labeling", NUM_LABELING_MACHINES, PROCESSING_TIME_LABELING_MEAN, PROCESSING_TIME_LABELING_STD),
+    ("Packaging Station", "Packaging", NUM_PACKAGING_STATIONS, PROCESSING_TIME_PACKAGING_MEAN, PROCESSING_TIME_PACKAGING_STD),
+]
+NUM_STAGES = len(STAGES)
+
+# --- Event Encoding ---
+# Stages are numbered by their position in STAGES; an event's kind is 0 for
+# a new order arriving at the factory and stage + 1 for an order finishing
+# its processing at that stage (it then requests the next stage straight
+# away, without an event of its own). Heap entries pack the kind together
+# with the order id as order_id * NUM_EVENT_KINDS + kind.
+NUM_EVENT_KINDS = NUM_STAGES + 1
+
+# Per-event trace records, replayed as log lines after the run
+TRACE_ARRIVE = 0
+TRACE_SEIZE = 1
+TRACE_FINISH = 2
+TRACE_DEPART = 3
+TRACE_EVENTS_PER_ORDER = 2 + 2 * NUM_STAGES
+
+# State of one stage's FIFO resource: units, units busy, and the head/tail
+# counters of its queue of waiting orders. The queue itself is a per-stage
+# ring buffer whose length is a power of two; the counters only ever grow
+# and are masked into it, so tail - head is the queue length.
+FIFO_RESOURCE = np.dtype([('capacity', np.int64), ('busy', np.int64), ('head', np.int64), ('tail', np.int64)])
+QUEUE_RING_SIZE = 1024 # Initial ring length per stage; a run whose queue outgrows it is redone with larger rings
+
+# fifo_request outcomes
+SEIZED = 1
+QUEUED = 0
+QUEUE_FULL = -1
 
-# --- Data Collection ---
-order_arrival_times = []
-order_departure_times = []
-wait_times_mixing = []
-wait_times_filling = []
-wait_times_capping = []
-wait_times_labeling = []
-wait_times_packaging = []
-
-orders_generated_count = 0 # Counts orders generated by the source
-orders_processed_mixing = 0
-orders_processed_filling = 0
-orders_processed_capping = 0
-orders_processed_labeling = 0
-orders_processed_packaging = 0 # Counts completed orders/batches
-total_bottles_produced_count = 0 # Counts total bottles from completed orders
 
 # To store the factory instance for end-of-simulation resource state reporting
 factory_instance = None 
 
-class SoftDrinkFactory:
+@njit(cache=True)
+def _heap_sift_up(heap_times, heap_seqs, heap_events, pos, t, seq, event):
+    """Moves the hole at `pos` up until (t, seq) fits below its parent, then fills it."""
+    while pos > 0:
+        parent = (pos - 1) >> 2
+        if t < heap_times[parent] or (t == heap_times[parent] and seq < heap_seqs[parent]):
+            heap_times[pos] = heap_times[parent]
+            heap_seqs[pos] = heap_seqs[parent]
+            heap_events[pos] = heap_events[parent]
+            pos = parent
+        else:
+            break
+    heap_times[pos] = t
+    heap_seqs[pos] = seq
+    heap_events[pos] = event
+
+
+@njit(cache=True)
+def heap_push(heap_times, heap_seqs, heap_events, size, t, seq, event):
+    """
+    Pushes an event onto a 4-ary min-heap held in parallel arrays.
+
+    Entries are ordered by (time, seq) so that events scheduled for the same
+    time fire in the order they were scheduled. Returns the new heap size.
     """
-    Represents the soft drink factory environment with production stages.
+    _heap_sift_up(heap_times, heap_seqs, heap_events, size, t, seq, event)
+    return size + 1
+
+
+@njit(cache=True)
+def heap_pop(heap_times, heap_seqs, heap_events, size):
     """
-    def __init__(self, env):
-        self.env = env
-        self.mixing_stations = simpy.Resource(env, capacity=NUM_MIXING_STATIONS)
-        self.filling_lines = simpy.Resource(env, capacity=NUM_FILLING_LINES)
-        self.capping_machines = simpy.Resource(env, capacity=NUM_CAPPING_MACHINES)
-        self.labeling_machines = simpy.Resource(env, capacity=NUM_LABELING_MACHINES)
-        self.packaging_stations = simpy.Resource(env, capacity=NUM_PACKAGING_STATIONS)
-
-    def mix_ingredients(self, order_name):
-        """Simulates mixing ingredients for a drink order."""
-        global orders_processed_mixing
-        processing_time = random.normalvariate(PROCESSING_TIME_MIXING_MEAN, PROCESSING_TIME_MIXING_STD)
-        processing_time = max(0.1, processing_time)
-        yield self.env.timeout(processing_time)
-        orders_processed_mixing += 1
-
-    def fill_bottles(self, order_name):
-        """Simulates filling bottles."""
-        global orders_processed_filling
-        processing_time = random.normalvariate(PROCESSING_TIME_FILLING_MEAN, PROCESSING_TIME_FILLING_STD)
-        processing_time = max(0.1, processing_time)
-        yield self.env.timeout(processing_time)
-        orders_processed_filling += 1
-
-    def cap_bottles(self, order_name):
-        """Simulates capping bottles."""
-        global orders_processed_capping
-        processing_time = random.normalvariate(PROCESSING_TIME_CAPPING_MEAN, PROCESSING_TIME_CAPPING_STD)
-        processing_time = max(0.1, processing_time)
-        yield self.env.timeout(processing_time)
-        orders_processed_capping += 1
-
-    def label_bottles(self, order_name):
-        """Simulates labeling bottles."""
-        global orders_processed_labeling
-        processing_time = random.normalvariate(PROCESSING_TIME_LABELING_MEAN, PROCESSING_TIME_LABELING_STD)
-        processing_time = max(0.1, processing_time)
-        yield self.env.timeout(processing_time)
-        orders_processed_labeling += 1
-
-    def package_drinks(self, order_name):
-        """Simulates packaging finished drinks and updates bottle count."""
-        global orders_processed_packaging, total_bottles_produced_count
-        processing_time = random.normalvariate(PROCESSING_TIME_PACKAGING_MEAN, PROCESSING_TIME_PACKAGING_STD)
-        processing_time = max(0.1, processing_time)
-        yield self.env.timeout(processing_time)
-        orders_processed_packaging += 1
-        total_bottles_produced_count += BOTTLES_PER_ORDER
-
-
-def drink_order_lifecycle(env, order_name, factory):
+    Pops the earliest event from a 4-ary min-heap held in parallel arrays.
+
+    The hole left at the root is walked down to a leaf by promoting the
+    smallest child at every level, then the former last entry fills the
+    hole and is sifted back up. Returns (time, event, new_size).
     """
-    Simulates the lifecycle of a drink order through the factory.
+    top_time = heap_times[0]
+    top_event = heap_events[0]
+    size -= 1
+    last_time = heap_times[size]
+    last_seq = heap_seqs[size]
+    last_event = heap_events[size]
+    pos = 0
+    child = 1
+    while child < size:
+        smallest = child
+        for other in range(child + 1, min(child + 4, size)):
+            if heap_times[other] < heap_times[smallest] or (heap_times[other] == heap_times[smallest] and heap_seqs[other] < heap_seqs[smallest]):
+                smallest = other
+        heap_times[pos] = heap_times[smallest]
+        heap_seqs[pos] = heap_seqs[smallest]
+        heap_events[pos] = heap_events[smallest]
+        pos = smallest
+        child = 4 * pos + 1
+    if size > 0:
+        _heap_sift_up(heap_times, heap_seqs, heap_events, pos, last_time, last_seq, last_event)
+    return top_time, top_event, size
+
+
+@njit(cache=True)
+def _record_trace(trace_times, trace_records, trace_values, trace_len, t, order, action, stage, value):
+    """Appends a trace record; a run given empty trace arrays records nothing."""
+    if trace_len >= trace_times.shape[0]:
+        return trace_len
+    trace_times[trace_len] = t
+    trace_records[trace_len, 0] = order
+    trace_records[trace_len, 1] = action
+    trace_records[trace_len, 2] = stage
+    trace_values[trace_len] = value
+    return trace_len + 1
+
+
+@njit(cache=True)
+def fifo_request(resource, queue_orders, queue_times, order, now):
     """
-    arrival_time = env.now
-    order_arrival_times.append(arrival_time)
-    print(f"{arrival_time:.2f}: {order_name} (batch for {BOTTLES_PER_ORDER} bottles) arrives at the factory.")
-
-    with factory.mixing_stations.request() as request_mix:
-        req_time_mix = env.now
-        yield request_mix
-        wait_start_mix = env.now
-        wait_times_mixing.append(wait_start_mix - req_time_mix)
-        print(f"{env.now:.2f}: {order_name} seizes Mixing Station. Waited {wait_start_mix - req_time_mix:.2f} min.")
-        yield env.process(factory.mix_ingredients(order_name))
-        print(f"{env.now:.2f}: {order_name} finishes Mixing.")
-
-    with factory.filling_lines.request() as request_fill:
-        req_time_fill = env.now
-        yield request_fill
-        wait_start_fill = env.now
-        wait_times_filling.append(wait_start_fill - req_time_fill)
-        print(f"{env.now:.2f}: {order_name} seizes Filling Line. Waited {wait_start_fill - req_time_fill:.2f} min.")
-        yield env.process(factory.fill_bottles(order_name))
-        print(f"{env.now:.2f}: {order_name} finishes Filling.")
-
-    with factory.capping_machines.request() as request_cap:
-        req_time_cap = env.now
-        yield request_cap
-        wait_start_cap = env.now
-        wait_times_capping.append(wait_start_cap - req_time_cap)
-        print(f"{env.now:.2f}: {order_name} seizes Capping Machine. Waited {wait_start_cap - req_time_cap:.2f} min.")
-        yield env.process(factory.cap_bottles(order_name))
-        print(f"{env.now:.2f}: {order_name} finishes Capping.")
-
-    with factory.labeling_machines.request() as request_label:
-        req_time_label = env.now
-        yield request_label
-        wait_start_label = env.now
-        wait_times_labeling.append(wait_start_label - req_time_label)
-        print(f"{env.now:.2f}: {order_name} seizes Labeling Machine. Waited {wait_start_label - req_time_label:.2f} min.")
-        yield env.process(factory.label_bottles(order_name))
-        print(f"{env.now:.2f}: {order_name} finishes Labeling.")
-
-    with factory.packaging_stations.request() as request_pack:
-        req_time_pack = env.now
-        yield request_pack
-        wait_start_pack = env.now
-        wait_times_packaging.append(wait_start_pack - req_time_pack)
-        print(f"{env.now:.2f}: {order_name} seizes Packaging Station. Waited {wait_start_pack - req_time_pack:.2f} min.")
-        yield env.process(factory.package_drinks(order_name))
-        print(f"{env.now:.2f}: {order_name} finishes packaging. Bottles from this batch: {BOTTLES_PER_ORDER}. Total bottles produced so far: {total_bottles_produced_count}.")
-
-    departure_time = env.now
-    order_departure_times.append(departure_time)
-    print(f"{departure_time:.2f}: {order_name} departs the factory. Total time in system: {departure_time - arrival_time:.2f} min.")
-
-
-def order_source(env, factory):
-    """Generates a target number of drink orders (batches)."""
-    global TARGET_ORDERS_TO_SIMULATE, orders_generated_count
-    
-    if TARGET_ORDERS_TO_SIMULATE <= 0:
-        print("Warning: TARGET_ORDERS_TO_SIMULATE is not positive. No orders will be generated.")
-        return
+    Seizes a unit of `resource` for `order` if one is free and returns SEIZED.
 
-    print(f"Order source will generate {TARGET_ORDERS_TO_SIMULATE} orders/batches.")
-    for i in range(TARGET_ORDERS_TO_SIMULATE):
-        orders_generated_count += 1
-        interarrival = random.expovariate(1.0 / DRINK_ORDER_INTERARRIVAL_TIME_MEAN)
-        yield env.timeout(interarrival)
-        
-        order_name = f"Order-{orders_generated_count}"
-        env.process(drink_order_lifecycle(env, order_name, factory))
-    
-    print(f"{env.now:.2f}: Source finished generating all {TARGET_ORDERS_TO_SIMULATE} planned orders/batches.")
+    Otherwise the order joins the back of the queue along with the time it
+    started waiting, and QUEUED is returned, or QUEUE_FULL if the ring buffer
+    has no room left.
+    """
+    if resource.busy < resource.capacity:
+        resource.busy += 1
+        return SEIZED
+    ring_size = queue_orders.shape[0]
+    if resource.tail - resource.head == ring_size:
+        return QUEUE_FULL
+    slot = resource.tail & (ring_size - 1)
+    queue_orders[slot] = order
+    queue_times[slot] = now
+    resource.tail += 1
+    return QUEUED
+
+
+@njit(cache=True)
+def fifo_release(resource, queue_orders, queue_times, now):
+    """
+    Releases a unit of `resource`.
+
+    If an order is waiting, the unit passes straight to the head of the queue
+    and (order, time waited) is returned; otherwise (-1, 0.0).
+    """
+    if resource.head < resource.tail:
+        slot = resource.head & (queue_orders.shape[0] - 1)
+        order = queue_orders[slot]
+        wait = now - queue_times[slot]
+        resource.head += 1
+        return order, wait
+    resource.busy -= 1
+    return -1, 0.0
+
+
+@njit(cache=True)
+def _start_processing(order, stage, wait, now, processing_times, wait_times, seized,
+                      heap_times, heap_seqs, heap_events, heap_size, seq,
+                      trace_times, trace_records, trace_values, trace_len):
+    """
+    Records the wait of `order`, which now holds a unit at `stage`, and
+    schedules the end of its processing there. Returns (heap_size, seq, trace_len).
+    """
+    i = seized[stage]
+    seized[stage] += 1
+    wait_times[stage, order] = wait
+    trace_len = _record_trace(trace_times, trace_records, trace_values, trace_len, now, order, TRACE_SEIZE, stage, wait)
+    heap_size = heap_push(heap_times, heap_seqs, heap_events, heap_size,
+                          now + processing_times[stage, i], seq, order * NUM_EVENT_KINDS + stage + 1)
+    return heap_size, seq + 1, trace_len
+
+
+@njit(cache=True)
+def run_loop(num_orders, fast_forward_after, processing_times, interarrivals,
+             arrival_times, departure_times, wait_times, processed,
+             resources, queue_orders, queue_times,
+             trace_times, trace_records, trace_values):
+    """
+    Runs the whole factory simulation as one compiled event loop.
+
+    Orders arrive at stage 0 with the pre-generated inter-arrival times and
+    move through the stages in sequence. At each stage an order seizes a free
+    unit or joins that stage's FIFO queue, is processed for the stage's next
+    pre-generated time, then releases the unit, handing it straight to the
+    head of the queue if anyone is waiting, and requests the next stage in
+    the same event. Per-order times, per-stage wait times and counts, the
+    final resource state and an event trace are written into the given
+    arrays. If `fast_forward_after` is positive, the source stops generating
+    orders once that many have completed, and the orders already in the
+    factory drain. Returns (end_time, trace_len, generated), where a
+    negative `generated` means a stage's queue outgrew its ring buffer and
+    the run was abandoned.
+    """
+    heap_times = np.empty(num_orders + 1, dtype=np.float64)
+    heap_seqs = np.empty(num_orders + 1, dtype=np.int64)
+    heap_events = np.empty(num_orders + 1, dtype=np.int64)
+    heap_size = 0
+    seq = 0
+    seized = np.zeros(NUM_STAGES, dtype=np.int64)
+    trace_len = 0
+    generated = 0
+    now = 0.0
+
+    if num_orders > 0:
+        heap_size = heap_push(heap_times, heap_seqs, heap_events, heap_size, interarrivals[0], seq, 0)
+        seq += 1
+
+    while heap_size > 0:
+        now, event, heap_size = heap_pop(heap_times, heap_seqs, heap_events, heap_size)
+        order = event // NUM_EVENT_KINDS
+        kind = event % NUM_EVENT_KINDS
+
+        if kind == 0:
+            # A new order enters the factory; the source schedules the next one
+            arrival_times[order] = now
+            generated = order + 1
+            trace_len = _record_trace(trace_times, trace_records, trace_values, trace_len, now, order, TRACE_ARRIVE, 0, 0.0)
+            if order + 1 < num_orders and (fast_forward_after <= 0 or processed[NUM_STAGES - 1] < fast_forward_after):
+                heap_size = heap_push(heap_times, heap_seqs, heap_events, heap_size,
+                                      now + interarrivals[order + 1], seq, (order + 1) * NUM_EVENT_KINDS)
+                seq += 1
+            status = fifo_request(resources[0], queue_orders[0], queue_times[0], order, now)
+            if status == QUEUE_FULL:
+                return now, trace_len, -1
+            if status == SEIZED:
+                heap_size, seq, trace_len = _start_processing(
+                    order, 0, 0.0, now, processing_times, wait_times, seized,
+                    heap_times, heap_seqs, heap_events, heap_size, seq,
+                    trace_times, trace_records, trace_values, trace_len)
+            continue
+
+        stage = kind - 1
+        processed[stage] += 1
+        if stage < NUM_STAGES - 1:
+            trace_len = _record_trace(trace_times, trace_records, trace_values, trace_len, now, order, TRACE_FINISH, stage, 0.0)
+        else:
+            departure_times[order] = now
+            trace_len = _record_trace(trace_times, trace_records, trace_values, trace_len, now, order, TRACE_FINISH, stage, processed[stage])
+            trace_len = _record_trace(trace_times, trace_records, trace_values, trace_len, now, order, TRACE_DEPART, stage, now - arrival_times[order])
+
+        waiting, wait = fifo_release(resources[stage], queue_orders[stage], queue_times[stage], now)
+        if waiting >= 0:
+            heap_size, seq, trace_len = _start_processing(
+                waiting, stage, wait, now, processing_times, wait_times, seized,
+                heap_times, heap_seqs, heap_events, heap_size, seq,
+                trace_times, trace_records, trace_values, trace_len)
+
+        next_stage = stage + 1
+        if next_stage < NUM_STAGES:
+            status = fifo_request(resources[next_stage], queue_orders[next_stage], queue_times[next_stage], order, now)
+            if status == QUEUE_FULL:
+                return now, trace_len, -1
+            if status == SEIZED:
+                heap_size, seq, trace_len = _start_processing(
+                    order, next_stage, 0.0, now, processing_times, wait_times, seized,
+                    heap_times, heap_seqs, heap_events, heap_size, seq,
+                    trace_times, trace_records, trace_values, trace_len)
+
+    return now, trace_len, generated
+
+
+def new_rng(seed):
+    """Creates the NumPy generator every random draw of a run comes from (PCG64DXSM bit generator)."""
+    return np.random.Generator(np.random.PCG64DXSM(seed))
+
+
+def processing_time_batch(rng, mean, std, size):
+    """Draws a batch of processing times in one NumPy call, clipped to at least 0.1 min."""
+    return np.maximum(rng.normal(mean, std, size), 0.1)
+
+
+class SoftDrinkFactory:
+    """
+    Represents the soft drink factory with its production stages.
+
+    Holds the processing and inter-arrival times pre-generated from `rng`
+    for `num_orders` orders (every order draws exactly one time per stage) and
+    a FIFO resource per stage, whose queue of waiting orders and the times they
+    joined it are rows of `queue_orders` and `queue_times`. The buffers
+    for the per-order and per-stage records are allocated up front too.
+    """
+    __slots__ = ('num_orders', 'rng', 'processing_times', 'interarrivals',
+                 'resources', 'queue_orders', 'queue_times',
+                 'arrival_times', 'departure_times', 'wait_times', 'processed',
+                 'orders_generated', 'simulated_orders', 'total_bottles')
+
+    def __init__(self, num_orders, rng):
+        self.num_orders = num_orders
+        self.rng = rng
+        self.processing_times = np.stack([processing_time_batch(rng, mean, std, num_orders) for _, _, _, mean, std in STAGES])
+        self.interarrivals = rng.exponential(DRINK_ORDER_INTERARRIVAL_TIME_MEAN, num_orders)
+        self.resources = np.zeros(NUM_STAGES, dtype=FIFO_RESOURCE)
+        self.resources['capacity'] = [units for _, _, units, _, _ in STAGES]
+        self.allocate_queues(min(QUEUE_RING_SIZE, num_orders))
+        self.arrival_times = np.empty(num_orders, dtype=np.float64)
+        self.departure_times = np.empty(num_orders, dtype=np.float64)
+        self.wait_times = np.empty((NUM_STAGES, num_orders), dtype=np.float64)
+        self.processed = np.zeros(NUM_STAGES, dtype=np.int64) # Orders finished per stage; the last entry counts completed orders/batches
+        self.orders_generated = 0
+        self.simulated_orders = 0
+        self.total_bottles = 0
+
+    def allocate_queues(self, min_ring_size):
+        """
+        Allocates empty per-stage queue ring buffers of at least `min_ring_size` entries.
+
+        The length is rounded up to a power of two so positions can be masked
+        into the ring. A queue never holds more than `num_orders` orders, so
+        rings of that size can never fill up.
+        """
+        ring_size = 1 << max(0, int(min_ring_size) - 1).bit_length()
+        self.queue_orders = np.empty((NUM_STAGES, ring_size), dtype=np.int64)
+        self.queue_times = np.empty((NUM_STAGES, ring_size), dtype=np.float64)
+        self.resources['busy'] = 0
+        self.resources['head'] = 0
+        self.resources['tail'] = 0
+
+    def stage_wait_times(self, stage):
+        """Wait times recorded at `stage`, indexed by order id; every order generated passes every stage."""
+        return self.wait_times[stage, :self.processed[stage]]
+
+    def cycle_times(self):
+        """Time in system of each completed order."""
+        completed = self.processed[-1]
+        return self.departure_times[:completed] - self.arrival_times[:completed]
+
+    def queue_length(self, stage):
+        """Number of orders waiting for a unit at `stage`."""
+        return self.resources[stage]['tail'] - self.resources[stage]['head']
+
+    def run(self, record_trace=False):
+        """
+        Simulates all `num_orders` orders through the factory, fast-forwarding
+        past the first FAST_FORWARD_AFTER completed orders unless a stage is
+        overloaded.
+
+        Returns the end time and, if `record_trace` is set, the event trace
+        as (times, records, values) arrays for print_event_trace; otherwise
+        the trace is None.
+        """
+        trace_size = self.num_orders * TRACE_EVENTS_PER_ORDER if record_trace else 0
+        trace_times = np.empty(trace_size, dtype=np.float64)
+        trace_records = np.empty((trace_size, 3), dtype=np.int64)
+        trace_values = np.empty(trace_size, dtype=np.float64)
+
+        # An overloaded stage's queue grows without bound, so there is no steady state to extrapolate
+        fast_forward_after = 0 if overloaded_stages() else FAST_FORWARD_AFTER
+        while True:
+            end_time, trace_len, self.simulated_orders = run_loop(
+                self.num_orders, fast_forward_after, self.processing_times, self.interarrivals,
+                self.arrival_times, self.departure_times, self.wait_times, self.processed,
+                self.resources, self.queue_orders, self.queue_times,
+                trace_times, trace_records, trace_values)
+            if self.simulated_orders >= 0:
+                break
+            # A queue outgrew its ring buffer; the pre-generated times make a rerun with larger rings identical
+            self.allocate_queues(2 * self.queue_orders.shape[1])
+            self.processed[:] = 0
+        if self.simulated_orders < self.num_orders:
+            end_time = self.fast_forward(end_time)
+        self.orders_generated = self.num_orders
+        self.total_bottles = int(self.processed[-1]) * BOTTLES_PER_ORDER
+        if not record_trace:
+            return end_time, None
+        return end_time, (trace_times[:trace_len], trace_records[:trace_len], trace_values[:trace_len])
+
+    def fast_forward(self, end_time):
+        """
+        Extrapolates the orders the source did not generate from those simulated in detail.
+
+        The remaining orders arrive with their pre-generated inter-arrival
+        times, and each takes the per-stage waits and cycle time of an order
+        resampled (with replacement) from the simulated ones. The first
+        FAST_FORWARD_WARMUP orders, which met a factory still filling up from
+        empty, are left out, so the rest reflect its steady state. Returns
+        the extrapolated end time.
+        """
+        simulated = self.simulated_orders
+        warmup = min(FAST_FORWARD_WARMUP, simulated // 2)
+        sampled = self.rng.integers(warmup, simulated, self.num_orders - simulated)
+        cycle_times = self.departure_times[:simulated] - self.arrival_times[:simulated]
+        self.arrival_times[simulated:] = self.arrival_times[simulated - 1] + np.cumsum(self.interarrivals[simulated:])
+        self.departure_times[simulated:] = self.arrival_times[simulated:] + cycle_times[sampled]
+        self.wait_times[:, simulated:] = self.wait_times[:, sampled]
+        self.processed[:] = self.num_orders
+        return max(end_time, self.departure_times[simulated:].max())
+
+
+def log(fmt, *args):
+    """Prints `fmt` formatted with `args` when VERBOSE is set; returns before formatting otherwise."""
+    if not VERBOSE:
+        return
+    print(fmt.format(*args))
+
+
+def print_event_trace(trace_times, trace_records, trace_values, num_orders):
+    """Prints the per-event log of a run from its recorded trace."""
+    # Convert the trace to Python scalars in bulk rather than boxing a NumPy scalar per field per event
+    for t, (order, action, stage), value in zip(trace_times.tolist(), trace_records.tolist(), trace_values.tolist()):
+        if action == TRACE_ARRIVE:
+            log("{:.2f}: Order-{} (batch for {} bottles) arrives at the factory.", t, order + 1, BOTTLES_PER_ORDER)
+            if order + 1 == num_orders:
+                log("{:.2f}: Source finished generating all {} planned orders/batches.", t, num_orders)
+        elif action == TRACE_SEIZE:
+            log("{:.2f}: Order-{} seizes {}. Waited {:.2f} min.", t, order + 1, STAGES[stage][0], value)
+        elif action == TRACE_FINISH and stage == NUM_STAGES - 1:
+            log("{:.2f}: Order-{} finishes packaging. Bottles from this batch: {}. Total bottles produced so far: {}.",
+                t, order + 1, BOTTLES_PER_ORDER, int(value) * BOTTLES_PER_ORDER)
+        elif action == TRACE_FINISH:
+            log("{:.2f}: Order-{} finishes {}.", t, order + 1, STAGES[stage][1])
+        else:
+            log("{:.2f}: Order-{} departs the factory. Total time in system: {:.2f} min.", t, order + 1, value)
 
 
 def plot_wait_time_histogram(wait_times, stage_name, sim_duration):
     """Generates and displays a histogram of wait times for a given stage."""
-    if not wait_times:
+    if wait_times.size == 0:
         print(f"No wait time data to plot for {stage_name}.")
         return
 
+    # Bin once in NumPy and draw the bars directly rather than having plt.hist re-process the samples
+    counts, edges = np.histogram(wait_times, bins=20)
     plt.figure(figsize=(10, 6))
-    plt.hist(wait_times, bins=20, edgecolor='black', alpha=0.7)
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', edgecolor='black', alpha=0.7)
     plt.title(f'Wait Time Distribution for {stage_name}\n(Simulation up to {sim_duration:.2f} minutes for {TARGET_ORDERS_TO_SIMULATE} target orders)')
     plt.xlabel("Wait Time (minutes)")
     plt.ylabel("Number of Orders")
     plt.grid(axis='y', alpha=0.75)
     plt.show()
 
-def run_simulation():
-    """Sets up and runs the SimPy simulation for a target number of orders/batches."""
-    global TARGET_ORDERS_TO_SIMULATE, factory_instance 
-    
-    if TARGET_ORDERS_TO_SIMULATE <= 0:
-        print("Cannot run simulation: Number of orders to simulate must be positive.")
-        return
+def plot_analytic_cycle_time(mean_cycle_time, std_cycle_time, num_orders):
+    """Displays the expected number of orders per cycle-time bin under a Normal approximation."""
+    edges = np.linspace(max(0.0, mean_cycle_time - 4 * std_cycle_time), mean_cycle_time + 4 * std_cycle_time, 21)
+    centers = (edges[:-1] + edges[1:]) / 2
+    density = np.exp(-0.5 * ((centers - mean_cycle_time) / std_cycle_time) ** 2) / (std_cycle_time * np.sqrt(2 * np.pi))
 
-    print(f"--- Soft Drink Factory Simulation Starting: Target {TARGET_ORDERS_TO_SIMULATE} Orders/Batches ---")
-    random.seed(RANDOM_SEED)
-    np.random.seed(RANDOM_SEED)
-
-    global order_arrival_times, order_departure_times, wait_times_mixing, wait_times_filling, wait_times_capping, wait_times_labeling, wait_times_packaging
-    global orders_generated_count, orders_processed_mixing, orders_processed_filling, orders_processed_capping, orders_processed_labeling, orders_processed_packaging, total_bottles_produced_count
-    order_arrival_times = []
-    order_departure_times = []
-    wait_times_mixing = []
-    wait_times_filling = []
-    wait_times_capping = []
-    wait_times_labeling = []
-    wait_times_packaging = []
-    orders_generated_count = 0
-    orders_processed_mixing = 0
-    orders_processed_filling = 0
-    orders_processed_capping = 0
-    orders_processed_labeling = 0
-    orders_processed_packaging = 0
-    total_bottles_produced_count = 0
-    
-    env = simpy.Environment()
-    factory_instance = SoftDrinkFactory(env)
-    env.process(order_source(env, factory_instance))
-    env.run()
+    plt.figure(figsize=(10, 6))
+    plt.bar(centers, num_orders * density * np.diff(edges), width=np.diff(edges), edgecolor='black', alpha=0.7)
+    plt.title(f'Approximate Cycle Time Distribution (analytic)\n(Normal with mean {mean_cycle_time:.2f} min, std dev {std_cycle_time:.2f} min for {num_orders} target orders)')
+    plt.xlabel("Cycle Time (minutes)")
+    plt.ylabel("Expected Number of Orders")
+    plt.grid(axis='y', alpha=0.75)
+    plt.show()
 
-    actual_simulation_duration = env.now
+def print_fast_forward_notice(num_orders, simulated_orders):
+    """Says whether the run fast-forwarded past its detailed orders, or why it did not."""
+    if simulated_orders < num_orders:
+        print(f"\nFast-forwarded {num_orders - simulated_orders} orders/batches from the first {simulated_orders} simulated in detail.")
+    elif 0 < FAST_FORWARD_AFTER < num_orders and overloaded_stages():
+        overloaded = ", ".join(f"{name} ({utilization * 100:.2f}%)" for name, utilization in overloaded_stages())
+        print(f"\nSimulated every order/batch in detail instead of fast-forwarding: overloaded {overloaded} never settles into a steady state to extrapolate from.")
 
-    print("\n--- Simulation Ended ---")
-    print(f"Target orders/batches to simulate: {TARGET_ORDERS_TO_SIMULATE}")
-    print(f"Orders/batches generated by source: {orders_generated_count}")
-    print(f"Actual total bottles produced: {total_bottles_produced_count} (from {orders_processed_packaging} completed orders/batches)")
-    print(f"Total simulation time: {actual_simulation_duration:.2f} minutes")
-    
+def print_run_report(num_orders, duration, processed, stage_wait_times, cycle_times, busy, queued, num_factories=1):
+    """
+    Prints the order, wait time, cycle time, utilization and resource state
+    sections of a run's report and plots the packaging wait times.
+
+    `processed`, `busy` and `queued` hold one count per stage,
+    `stage_wait_times` one array of waits per stage, and `cycle_times` one
+    entry per completed order. A sharded run passes them pooled across its
+    `num_factories` independent factories, whose machines then count
+    together towards utilization over `duration`.
+    """
     print(f"\n--- Order / Batch Summary ---")
-    print(f"Total orders (batches) arrived at system: {len(order_arrival_times)}")
-    print(f"Total orders (batches) departed from system: {len(order_departure_times)}") 
-    print(f"Orders (batches) processed by Mixing: {orders_processed_mixing}")
-    print(f"Orders (batches) processed by Filling: {orders_processed_filling}")
-    print(f"Orders (batches) processed by Capping: {orders_processed_capping}")
-    print(f"Orders (batches) processed by Labeling: {orders_processed_labeling}")
-    print(f"Orders (batches) completed packaging: {orders_processed_packaging}")
+    print(f"Total orders (batches) arrived at system: {num_orders}")
+    print(f"Total orders (batches) departed from system: {processed[-1]}") 
+    for (_, activity, _, _, _), stage_processed in zip(STAGES[:-1], processed):
+        print(f"Orders (batches) processed by {activity}: {stage_processed}")
+    print(f"Orders (batches) completed {STAGES[-1][1].lower()}: {processed[-1]}")
 
     print(f"\n--- Wait Time Statistics (for orders/batches) ---")
-    def print_avg_wait_time(wait_times_list, stage_name):
-        if wait_times_list:
-            avg_wait = np.mean(wait_times_list)
+    def print_avg_wait_time(stage_wait_times, stage_name):
+        if stage_wait_times.size > 0:
+            avg_wait = np.mean(stage_wait_times)
             print(f"Average wait time for {stage_name}: {avg_wait:.2f} minutes")
         else:
             print(f"No orders recorded waiting for {stage_name}.")
 
-    print_avg_wait_time(wait_times_mixing, "Mixing Station")
-    print_avg_wait_time(wait_times_filling, "Filling Line")
-    print_avg_wait_time(wait_times_capping, "Capping Machine")
-    print_avg_wait_time(wait_times_labeling, "Labeling Machine")
-    print_avg_wait_time(wait_times_packaging, "Packaging Station")
+    for (name, _, _, _, _), waits in zip(STAGES, stage_wait_times):
+        print_avg_wait_time(waits, name)
 
     print(f"\n--- System Performance ---")
-    if order_departure_times and order_arrival_times:
-        completed_orders_count_for_cycle_time = len(order_departure_times)
-        if completed_orders_count_for_cycle_time > 0:
-            relevant_arrivals = order_arrival_times[:completed_orders_count_for_cycle_time]
-            total_cycle_time = sum(dep - arr for arr, dep in zip(relevant_arrivals, order_departure_times))
-            avg_cycle_time = total_cycle_time / completed_orders_count_for_cycle_time
-            print(f"Average cycle time for {completed_orders_count_for_cycle_time} completed orders/batches: {avg_cycle_time:.2f} minutes")
-        else:
-            print("No orders completed processing for cycle time calculation.")
+    if cycle_times.size > 0:
+        print(f"Average cycle time for {cycle_times.size} completed orders/batches: {cycle_times.mean():.2f} minutes")
     else:
-        print("Not enough data for cycle time calculation.")
+        print("No orders completed processing for cycle time calculation.")
 
     print(f"\n--- Resource Utilization (Estimated for Orders/Batches) ---")
     def print_utilization(num_machines, items_processed_at_stage, mean_processing_time_per_item, stage_name, total_sim_time):
@@ -286,35 +537,208 @@ def run_simulation():
         utilization = min(utilization, 100.0)
         print(f"Estimated utilization for {stage_name}: {utilization:.2f}% (based on {items_processed_at_stage} orders over {total_sim_time:.2f} min)")
 
-    if actual_simulation_duration > 0:
-        print_utilization(NUM_MIXING_STATIONS, orders_processed_mixing, PROCESSING_TIME_MIXING_MEAN, "Mixing Station(s)", actual_simulation_duration)
-        print_utilization(NUM_FILLING_LINES, orders_processed_filling, PROCESSING_TIME_FILLING_MEAN, "Filling Line(s)", actual_simulation_duration)
-        print_utilization(NUM_CAPPING_MACHINES, orders_processed_capping, PROCESSING_TIME_CAPPING_MEAN, "Capping Machine(s)", actual_simulation_duration)
-        print_utilization(NUM_LABELING_MACHINES, orders_processed_labeling, PROCESSING_TIME_LABELING_MEAN, "Labeling Machine(s)", actual_simulation_duration)
-        print_utilization(NUM_PACKAGING_STATIONS, orders_processed_packaging, PROCESSING_TIME_PACKAGING_MEAN, "Packaging Station(s) (completed orders)", actual_simulation_duration)
+    if duration > 0:
+        for stage, (name, _, units, mean, _) in enumerate(STAGES):
+            label = f"{name}(s) (completed orders)" if stage == NUM_STAGES - 1 else f"{name}(s)"
+            print_utilization(units * num_factories, processed[stage], mean, label, duration)
     else:
         print("Simulation duration was zero. Cannot calculate utilization.")
 
-    print(f"\n--- Resource State at End of Simulation (Time: {actual_simulation_duration:.2f}) ---")
-    if factory_instance:
-        print(f"Mixing Station(s):     Processing: {factory_instance.mixing_stations.count}, In Queue: {len(factory_instance.mixing_stations.queue)}")
-        print(f"Filling Line(s):       Processing: {factory_instance.filling_lines.count}, In Queue: {len(factory_instance.filling_lines.queue)}")
-        print(f"Capping Machine(s):    Processing: {factory_instance.capping_machines.count}, In Queue: {len(factory_instance.capping_machines.queue)}")
-        print(f"Labeling Machine(s):   Processing: {factory_instance.labeling_machines.count}, In Queue: {len(factory_instance.labeling_machines.queue)}")
-        print(f"Packaging Station(s):  Processing: {factory_instance.packaging_stations.count}, In Queue: {len(factory_instance.packaging_stations.queue)}")
-    else:
-        print("Factory instance not available for final resource state.")
+    print(f"\n--- Resource State at End of Simulation (Time: {duration:.2f}) ---")
+    for (name, _, _, _, _), stage_busy, stage_queued in zip(STAGES, busy, queued):
+        print(f"{name + '(s):':<23}Processing: {stage_busy}, In Queue: {stage_queued}")
 
     print("\n--- Visualizations ---")
-    plot_wait_time_histogram(wait_times_packaging, "Packaging Station", actual_simulation_duration)
+    plot_wait_time_histogram(stage_wait_times[-1], STAGES[-1][0], duration)
 
-if __name__ == "__main__":
-    verbose_simulation_output = False 
+def run_simulation(mode="simulate"):
+    """
+    Sets up and runs the event-driven simulation for a target number of orders/batches.
 
-    def conditional_print(*args, **kwargs):
-        if verbose_simulation_output:
-            print(*args, **kwargs)
+    With mode="analytic" nothing is simulated; run_analytic_estimate reports
+    closed-form steady-state estimates instead.
+    """
+    global TARGET_ORDERS_TO_SIMULATE, factory_instance 
+    
+    if TARGET_ORDERS_TO_SIMULATE <= 0:
+        print("Cannot run simulation: Number of orders to simulate must be positive.")
+        return
 
+    if mode == "analytic":
+        run_analytic_estimate()
+        return
+
+    print(f"--- Soft Drink Factory Simulation Starting: Target {TARGET_ORDERS_TO_SIMULATE} Orders/Batches ---")
+
+    # Every order draws exactly one processing time per stage and one inter-arrival time
+    factory_instance = SoftDrinkFactory(TARGET_ORDERS_TO_SIMULATE, new_rng(RANDOM_SEED))
+    num_orders = factory_instance.num_orders
+    print(f"Order source will generate {num_orders} orders/batches.")
+    # The per-event log is only recorded when it will be printed, then dumped in one pass after the run
+    actual_simulation_duration, trace = factory_instance.run(record_trace=VERBOSE)
+    if trace is not None:
+        print_event_trace(*trace, num_orders)
+
+    processed = factory_instance.processed
+    print_fast_forward_notice(num_orders, factory_instance.simulated_orders)
+
+    print("\n--- Simulation Ended ---")
+    print(f"Target orders/batches to simulate: {TARGET_ORDERS_TO_SIMULATE}")
+    print(f"Orders/batches generated by source: {factory_instance.orders_generated}")
+    print(f"Actual total bottles produced: {factory_instance.total_bottles} (from {processed[-1]} completed orders/batches)")
+    print(f"Total simulation time: {actual_simulation_duration:.2f} minutes")
+
+    print_run_report(num_orders, actual_simulation_duration, processed,
+                     [factory_instance.stage_wait_times(stage) for stage in range(NUM_STAGES)],
+                     factory_instance.cycle_times(),
+                     factory_instance.resources['busy'],
+                     [factory_instance.queue_length(stage) for stage in range(NUM_STAGES)])
+
+def _run_shard(shard_id, num_orders):
+    """Simulates one independent factory shard; runs in a worker process."""
+    factory = SoftDrinkFactory(num_orders, new_rng(RANDOM_SEED + shard_id))
+    end_time, _ = factory.run()
+    stage_wait_times = [factory.stage_wait_times(stage) for stage in range(NUM_STAGES)]
+    queued = [factory.queue_length(stage) for stage in range(NUM_STAGES)]
+    return end_time, factory.simulated_orders, factory.processed, stage_wait_times, factory.cycle_times(), factory.resources['busy'], queued
+
+
+def run_simulation_sharded(n_shards):
+    """
+    Splits the target orders across `n_shards` independent virtual factories run in parallel.
+
+    The pipeline has no feedback between orders of different factories, so
+    every shard runs on its own in a worker process, seeded with
+    RANDOM_SEED + shard id so the combined results are deterministic. Counts,
+    wait and cycle times are pooled across shards and reported by
+    print_run_report like a single run; since the factories run side by
+    side, the overall simulation time is that of the slowest shard. Shards
+    record no event trace, so VERBOSE only applies to unsharded runs.
+    """
+    if TARGET_ORDERS_TO_SIMULATE <= 0:
+        print("Cannot run simulation: Number of orders to simulate must be positive.")
+        return
+
+    n_shards = max(1, min(n_shards, TARGET_ORDERS_TO_SIMULATE))
+    base_orders, extra_orders = divmod(TARGET_ORDERS_TO_SIMULATE, n_shards)
+    shard_orders = [base_orders + (1 if shard_id < extra_orders else 0) for shard_id in range(n_shards)]
+    print(f"--- Soft Drink Factory Simulation Starting: Target {TARGET_ORDERS_TO_SIMULATE} Orders/Batches across {n_shards} shards ---")
+    if VERBOSE:
+        print("VERBOSE is ignored for sharded runs; set NUM_SHARDS = 1 for the per-event log.")
+
+    with multiprocessing.Pool(n_shards) as pool:
+        results = pool.starmap(_run_shard, enumerate(shard_orders))
+
+    end_times, simulated_orders, processed, stage_wait_times, cycle_times, busy, queued = zip(*results)
+    duration = max(end_times)
+    processed = np.sum(processed, axis=0)
+    completed = processed[-1]
+    print_fast_forward_notice(TARGET_ORDERS_TO_SIMULATE, sum(simulated_orders))
+
+    print(f"\n--- Sharded Simulation Ended ---")
+    print(f"Target orders/batches to simulate: {TARGET_ORDERS_TO_SIMULATE}")
+    print(f"Orders/batches per shard: {shard_orders}")
+    print(f"Actual total bottles produced: {completed * BOTTLES_PER_ORDER} (from {completed} completed orders/batches)")
+    print(f"Total simulation time (slowest shard): {duration:.2f} minutes")
+
+    print_run_report(TARGET_ORDERS_TO_SIMULATE, duration, processed,
+                     [np.concatenate(waits) for waits in zip(*stage_wait_times)],
+                     np.concatenate(cycle_times), np.sum(busy, axis=0), np.sum(queued, axis=0),
+                     num_factories=n_shards)
+
+def analytic_stage_estimates():
+    """
+    Approximates each stage's steady-state utilization and mean wait without simulating.
+
+    Orders arrive as a Poisson stream (squared coefficient of variation
+    Ca^2 = 1). A stage with c units and processing time mean m, std s runs at
+    utilization rho = lambda * m / c, where lambda is the rate orders reach it:
+    the arrival rate, capped at c / m by any overloaded stage upstream, which
+    passes orders on no faster than it can process them. Its mean wait follows
+    Kingman's formula, extended to c units with Sakasegawa's approximation:
+
+        E[W] ~ rho^(sqrt(2(c + 1)) - 1) / (c (1 - rho)) * (Ca^2 + Cs^2) / 2 * m
+
+    with Cs^2 = (s / m)^2. The leading factor rho^(sqrt(2(c + 1)) - 1) is
+    Sakasegawa's probability P that an order has to wait at all; an order
+    that does wait is taken to wait an exponential time with mean E[W] / P,
+    so the wait has variance E[W]^2 (2 / P - 1). Each stage's departures
+    feed the next, with their variability given by Whitt's linking equation
+    Cd^2 = 1 + (1 - rho^2)(Ca^2 - 1) + rho^2 (Cs^2 - 1) / sqrt(c).
+    Returns a list of (utilization, mean wait, wait variance) per stage; an
+    overloaded stage (rho >= 1) has an infinite mean wait and variance.
+    """
+    estimates = []
+    arrival_scv = 1.0
+    throughput = 1 / DRINK_ORDER_INTERARRIVAL_TIME_MEAN
+    for _, _, units, mean, std in STAGES:
+        utilization = throughput * mean / units
+        service_scv = (std / mean) ** 2
+        if utilization >= 1:
+            estimates.append((utilization, float('inf'), float('inf')))
+            # A saturated stage releases orders at its processing rate and with its processing variability
+            throughput = units / mean
+            arrival_scv = service_scv
+            continue
+        wait_probability = utilization ** (np.sqrt(2 * (units + 1)) - 1)
+        mean_wait = wait_probability / (units * (1 - utilization)) * (arrival_scv + service_scv) / 2 * mean
+        estimates.append((utilization, mean_wait, mean_wait ** 2 * (2 / wait_probability - 1)))
+        arrival_scv = (1 + (1 - utilization ** 2) * (arrival_scv - 1)
+                       + utilization ** 2 * (service_scv - 1) / np.sqrt(units))
+    return estimates
+
+
+def overloaded_stages():
+    """Names and analytic utilizations of the stages that cannot keep up with the orders reaching them."""
+    return [(name, utilization) for (name, _, _, _, _), (utilization, _, _) in zip(STAGES, analytic_stage_estimates())
+            if utilization >= 1]
+
+
+def run_analytic_estimate():
+    """
+    Reports closed-form estimates for the target orders instead of simulating them.
+
+    The five processing times are independent Normals, so an order's total
+    processing time is Normal with the summed means and summed variances; the
+    cycle time adds each stage's wait from analytic_stage_estimates, taking
+    the waits as independent so their variances add too. The
+    run lasts about as long as the arrivals plus one cycle time, unless a
+    stage is overloaded: then the orders leave at the bottleneck's rate, so
+    the run lasts as long as the bottleneck takes to process them all plus
+    one pass through the other stages, but no less than the arrivals plus
+    one pass through every stage.
+    """
+    print(f"--- Soft Drink Factory Analytic Estimate: Target {TARGET_ORDERS_TO_SIMULATE} Orders/Batches ---")
+    estimates = analytic_stage_estimates()
+    bottleneck = min(range(NUM_STAGES), key=lambda stage: STAGES[stage][2] / STAGES[stage][3])
+    mean_processing_time = sum(mean for _, _, _, mean, _ in STAGES)
+    mean_cycle_time = mean_processing_time + sum(mean_wait for _, mean_wait, _ in estimates)
+    std_cycle_time = np.sqrt(sum(std ** 2 for _, _, _, _, std in STAGES) + sum(wait_variance for _, _, wait_variance in estimates))
+    if np.isfinite(mean_cycle_time):
+        estimated_duration = TARGET_ORDERS_TO_SIMULATE * DRINK_ORDER_INTERARRIVAL_TIME_MEAN + mean_cycle_time
+    else:
+        _, _, units, mean, _ = STAGES[bottleneck]
+        estimated_duration = max(TARGET_ORDERS_TO_SIMULATE * mean / units + mean_processing_time - mean,
+                                 TARGET_ORDERS_TO_SIMULATE * DRINK_ORDER_INTERARRIVAL_TIME_MEAN + mean_processing_time)
+
+    print(f"Bottleneck stage: {STAGES[bottleneck][0]} (utilization {estimates[bottleneck][0] * 100:.2f}%)")
+    print(f"Estimated total bottles produced: {TARGET_ORDERS_TO_SIMULATE * BOTTLES_PER_ORDER}")
+    print(f"Estimated total time: {estimated_duration:.2f} minutes")
+
+    print(f"\n--- Wait Time Estimates (for orders/batches) ---")
+    for (name, _, _, _, _), (utilization, mean_wait, _) in zip(STAGES, estimates):
+        print(f"Average wait time for {name}: {mean_wait:.2f} minutes (utilization {utilization * 100:.2f}%)")
+
+    print(f"\n--- System Performance ---")
+    print(f"Average cycle time: {mean_cycle_time:.2f} minutes (std dev {std_cycle_time:.2f} minutes)")
+
+    print("\n--- Visualizations ---")
+    if np.isfinite(mean_cycle_time):
+        plot_analytic_cycle_time(mean_cycle_time, std_cycle_time, TARGET_ORDERS_TO_SIMULATE)
+    else:
+        print(f"{STAGES[bottleneck][0]} is overloaded; no steady-state cycle time to plot.")
+
+if __name__ == "__main__":
     while True:
         try:
             num_orders_str = input("Enter the total number of orders (batches) to simulate (e.g., 5): ")
@@ -328,6 +752,9 @@ if __name__ == "__main__":
 
     print(f"Simulating {TARGET_ORDERS_TO_SIMULATE} orders/batches, with {BOTTLES_PER_ORDER} bottles per order/batch.")
     start_real_time = time.time()
-    run_simulation()
+    if NUM_SHARDS > 1 and SIMULATION_MODE == "simulate":
+        run_simulation_sharded(NUM_SHARDS)
+    else:
+        run_simulation(mode=SIMULATION_MODE)
     end_real_time = time.time()
     print(f"\nActual wall-clock time for simulation run: {end_real_time - start_real_time:.4f} seconds") 